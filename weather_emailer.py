@@ -1,16 +1,279 @@
 import os
+import re
+import bisect
+import functools
+import logging
 import sys
+import time
+import threading
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from string import Template
 from datetime import datetime, timedelta
 import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.image import MIMEImage
+import ssl
+from email.message import EmailMessage, MIMEPart
 
+log = logging.getLogger(__name__)
 
-def get_weather_forecast(api_key, latitude, longitude):
+# Responses are cached on disk so repeated runs skip the OpenWeather round trip
+CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'sweaterweather.json')
+CACHE_TTL = 15 * 60  # seconds
+CACHE_KEEP = 24 * 60 * 60  # expired entries are kept this long so they can be revalidated
+_CACHE_LOCK = threading.Lock()
+
+# Supported UNITS settings: OpenWeather 'units' value, display labels, and factors
+# converting the API's wind speed (m/s for metric, mph for imperial) for display and to km/h
+UNIT_SYSTEMS = {
+    'metric': {'temp': '°C', 'wind': 'km/h', 'wind_display': 3.6, 'wind_kmh': 3.6},
+    'imperial': {'temp': '°F', 'wind': 'mph', 'wind_display': 1, 'wind_kmh': 1.609344},
+}
+
+# Section divider used in the plain-text email
+DIVIDER = "━" * 40
+
+# Plain-text email layout around the numbered recommendation list
+_TEXT_HEADER_FMT = """Good morning!
+
+Here's your weather forecast and clothing recommendations for today:
+
+WEATHER SUMMARY
+{divider}
+Current: {current_temp}{deg} (feels like {feels_like}{deg})
+High: {temp_high}{deg}
+Low: {temp_low}{deg}
+Conditions: {weather_desc}
+Precipitation chance: {precipitation_prob}%
+Humidity: {humidity}%
+Wind speed: {wind_speed} {wind_unit}
+
+WHAT TO WEAR TODAY
+{divider}
+"""
+_TEXT_FOOTER_FMT = """
+
+{divider}
+
+Have a great day!
+
+---
+Generated on {generated_on}
+"""
+
+# HTML email layout; $placeholders are filled in by create_email_body
+_HTML_TMPL = Template("""
+    <html>
+    <head>
+        <style>
+            body { font-family: Arial, sans-serif; line-height: 1.6; color: #333; }
+            .container { max-width: 600px; margin: 0 auto; padding: 20px; text-align: center; }
+            .weather-icon { text-align: center; margin: 20px auto; display: block; }
+            .weather-icon img { max-width: 200px; height: auto; display: inline-block; vertical-align: middle; }
+            .weather-summary { background-color: #f4f4f4; padding: 15px; border-radius: 5px; margin: 20px 0; text-align: left; }
+            .weather-summary h2 { margin-top: 0; color: #2c3e50; }
+            .weather-detail { margin: 10px 0; }
+            .recommendations { background-color: #e8f4f8; padding: 15px; border-radius: 5px; text-align: left; }
+            .recommendations h2 { margin-top: 0; color: #2c3e50; }
+            ul { padding-left: 20px; }
+            li { margin: 8px 0; }
+            .footer { margin-top: 30px; padding-top: 20px; border-top: 1px solid #ddd; font-size: 0.9em; color: #666; text-align: center; }
+            h1, p { text-align: center; }
+        </style>
+    </head>
+    <body>
+        <div class="container">
+            <h1>Good morning!</h1>
+            <p>Here's your weather forecast and clothing recommendations for today:</p>
+
+            <div class="weather-icon">
+                <img src="cid:weather_icon" alt="Weather Icon">
+                $windy_img
+            </div>
+
+            <div class="weather-summary">
+                <h2>Weather Summary</h2>
+                <div class="weather-detail"><strong>Current:</strong> $current_temp$deg (feels like $feels_like$deg)</div>
+                <div class="weather-detail"><strong>High:</strong> $temp_high$deg</div>
+                <div class="weather-detail"><strong>Low:</strong> $temp_low$deg</div>
+                <div class="weather-detail"><strong>Conditions:</strong> $weather_desc</div>
+                <div class="weather-detail"><strong>Precipitation chance:</strong> $precipitation_prob%</div>
+                <div class="weather-detail"><strong>Humidity:</strong> $humidity%</div>
+                <div class="weather-detail"><strong>Wind speed:</strong> $wind_speed $wind_unit</div>
+            </div>
+
+            <div class="recommendations">
+                <h2>What to Wear Today</h2>
+                <ul>
+                    $recommendations_html
+                </ul>
+            </div>
+
+            <p><strong>Have a great day!</strong></p>
+
+            <div class="footer">
+                Generated on $generated_on
+            </div>
+        </div>
+    </body>
+    </html>
+    """)
+_LI_FMT = "<li>{}</li>".format
+_WINDY_IMG = "<img src='cid:windy_icon' alt='Windy' style='margin-left: 10px;'>"
+
+# Date formats for the subject line and the "Generated on" footer
+_SUBJECT_FMT = '%B %d, %Y'
+_BODY_FMT = '%Y-%m-%d at %I:%M %p'
+
+# Condition keywords that drive clothing recommendations, matched in one pass
+_CONDITION_RE = re.compile(r'rain|drizzle|snow|clear|sun')
+
+# Weather icons live next to this script; resolve their absolute paths once
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+_ICON_PATHS = {
+    name: os.path.join(_SCRIPT_DIR, f'{name}.png')
+    for name in ('thunder', 'snow', 'rainy cloud', 'cloudy', 'partly sunny', 'sun', 'windy')
+}
+
+# Icon rules in priority order, matched as substrings of the lowercased condition
+_ICON_RULES = [
+    (('thunder',), 'thunder'),
+    (('snow', 'sleet', 'flurr'), 'snow'),
+    (('rain', 'drizzle'), 'rainy cloud'),
+    (('cloud',), 'cloudy'),
+    (('clear', 'sun'), 'sun'),
+]
+_PARTLY_CLOUDY_KW = ('few', 'scattered', 'partly')
+
+# Clothing by daily high (Celsius); each threshold is the inclusive lower bound of the next bucket
+_TEMP_HIGH_THRESHOLDS = [4, 10, 18, 24]
+_TEMP_HIGH_RECS = [
+    ("Heavy winter clothing (coat, warm layers)",),
+    ("Warm layers (sweater, jacket)",),
+    ("Medium layers (long sleeves, sweater or light jacket)",),
+    ("Light layers (t-shirt with light jacket)",),
+    ("Light clothing (t-shirt, shorts/skirt)", "Wear light breathable clothing"),
+]
+
+# Umbrella advice by precipitation chance (%), used when it isn't already raining
+_PRECIP_THRESHOLDS = [30, 50]
+_PRECIP_RECS = [
+    (),
+    ("Consider bringing an umbrella",),
+    ("Bring an umbrella or rain jacket",),
+]
+
+# Shared session so OpenWeather calls reuse pooled keep-alive TLS connections.
+# Connection errors and transient statuses are retried up to 3 times with exponential
+# backoff; other 4xx responses fail immediately via raise_for_status.
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=4,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=['GET']
+    )
+))
+
+# The current weather and forecast endpoints are independent, so fetch them in parallel,
+# with a third worker to log in to SMTP at the same time
+_EXECUTOR = ThreadPoolExecutor(max_workers=3)
+
+
+def _load_cache():
+    """
+    Load the response cache from disk, treating a missing or corrupt file as empty
+    """
+    try:
+        with open(CACHE_PATH, 'rb') as cache_file:
+            return orjson.loads(cache_file.read())
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(cache):
+    """
+    Write the response cache to disk, dropping entries expired for longer than CACHE_KEEP
+    """
+    cutoff = time.time() - CACHE_KEEP
+    cache = {key: entry for key, entry in cache.items() if entry['expires'] > cutoff}
+    try:
+        os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+        # Write then rename so a concurrent reader never sees a half-written file
+        tmp_path = f"{CACHE_PATH}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as cache_file:
+            cache_file.write(orjson.dumps(cache))
+        os.replace(tmp_path, CACHE_PATH)
+    except OSError as e:
+        log.warning("Could not write weather cache: %s", e)
+
+
+def fetch_json(url, params):
+    """
+    GET an OpenWeather endpoint, serving from the cache while the entry is fresh
+    and revalidating it with a conditional request once it has expired
+    If the request fails or returns a body that isn't JSON, an expired entry
+    (up to CACHE_KEEP old) is returned instead
+    Cache keys use coordinates rounded to 2 decimals (~1 km) plus the units
+    """
+    endpoint = url.rsplit('/', 1)[-1]
+    key = f"ow:{round(float(params['lat']), 2)}:{round(float(params['lon']), 2)}:{params['units']}:{endpoint}"
+
+    cache = _load_cache()
+    entry = cache.get(key)
+    if entry and entry['expires'] > time.time():
+        return entry['data']
+
+    headers = {}
+    if entry:
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+    try:
+        response = _SESSION.get(url, params=params, headers=headers, timeout=(3, 10))
+        response.raise_for_status()
+
+        if response.status_code == 304 and entry:
+            # Unchanged since the cached copy, so just extend its lifetime
+            entry['expires'] = time.time() + CACHE_TTL
+        else:
+            entry = {
+                'expires': time.time() + CACHE_TTL,
+                # orjson parses the raw bytes directly, skipping requests' text decoding;
+                # a non-JSON body raises orjson.JSONDecodeError (a ValueError)
+                'data': orjson.loads(response.content),
+                'etag': response.headers.get('ETag'),
+                # Without Last-Modified, the response Date is a valid If-Modified-Since value
+                'last_modified': response.headers.get('Last-Modified') or response.headers.get('Date')
+            }
+    except (requests.exceptions.RequestException, ValueError) as e:
+        if not entry:
+            raise
+        # Fall back to the last good response rather than failing the whole run
+        log.warning("Could not refresh %s data (%s). Using cached data.", endpoint, e)
+        return entry['data']
+
+    # Re-read under the lock so parallel fetches don't drop each other's entries
+    with _CACHE_LOCK:
+        cache = _load_cache()
+        cache[key] = entry
+        _save_cache(cache)
+    return entry['data']
+
+
+def get_weather_forecast(api_key, latitude, longitude, units='metric'):
     """
     Fetch weather forecast using free Current Weather + 5 Day Forecast APIs
+    units is 'metric' (Celsius, m/s) or 'imperial' (Fahrenheit, mph)
     """
     # Get current weather
     current_url = f"https://api.openweathermap.org/data/2.5/weather"
@@ -18,7 +281,7 @@ def get_weather_forecast(api_key, latitude, longitude):
         'lat': latitude,
         'lon': longitude,
         'appid': api_key,
-        'units': 'metric'  # Use Celsius
+        'units': units
     }
 
     # Get 5-day forecast
@@ -27,19 +290,16 @@ def get_weather_forecast(api_key, latitude, longitude):
         'lat': latitude,
         'lon': longitude,
         'appid': api_key,
-        'units': 'metric'  # Use Celsius
+        'units': units,
+        'cnt': 1  # Only the next 3-hour slot is used, so skip the other 39
     }
 
     try:
-        # Fetch current weather
-        current_response = requests.get(current_url, params=current_params)
-        current_response.raise_for_status()
-        current_data = current_response.json()
-
-        # Fetch forecast
-        forecast_response = requests.get(forecast_url, params=forecast_params)
-        forecast_response.raise_for_status()
-        forecast_data = forecast_response.json()
+        # Fetch current weather and forecast concurrently
+        current_future = _EXECUTOR.submit(fetch_json, current_url, current_params)
+        forecast_future = _EXECUTOR.submit(fetch_json, forecast_url, forecast_params)
+        current_data = current_future.result()
+        forecast_data = forecast_future.result()
 
         # Transform into format similar to One Call API for compatibility
         return {
@@ -60,32 +320,27 @@ def get_weather_forecast(api_key, latitude, longitude):
                 'wind_speed': current_data['wind']['speed']
             }]
         }
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching weather data: {e}")
+    except (requests.exceptions.RequestException, ValueError) as e:
+        # ValueError covers a 200 response whose body isn't JSON (e.g. a proxy error page)
+        log.error("Error fetching weather data: %s", e)
         if hasattr(e, 'response') and e.response is not None:
-            print(f"Response status: {e.response.status_code}")
-            print(f"Response body: {e.response.text}")
+            log.error("Response status: %s", e.response.status_code)
+            log.error("Response body: %s", e.response.text)
         sys.exit(1)
 
 
+@functools.lru_cache(maxsize=512)
 def get_clothing_recommendation(temp_high, temp_low, weather_condition, precipitation_prob, wind_speed_kmh):
     """
     Generate clothing recommendations based on weather conditions (Celsius)
+    weather_condition must already be lowercase
+    Returns a tuple so the cached result can't be mutated by callers
     """
     recommendations = []
+    conditions = set(_CONDITION_RE.findall(weather_condition))
 
     # Temperature-based recommendations (Celsius)
-    if temp_high >= 24:
-        recommendations.append("Light clothing (t-shirt, shorts/skirt)")
-        recommendations.append("Wear light breathable clothing")
-    elif temp_high >= 18:
-        recommendations.append("Light layers (t-shirt with light jacket)")
-    elif temp_high >= 10:
-        recommendations.append("Medium layers (long sleeves, sweater or light jacket)")
-    elif temp_high >= 4:
-        recommendations.append("Warm layers (sweater, jacket)")
-    else:
-        recommendations.append("Heavy winter clothing (coat, warm layers)")
+    recommendations.extend(_TEMP_HIGH_RECS[bisect.bisect_right(_TEMP_HIGH_THRESHOLDS, temp_high)])
 
     # Specific temperature-based clothing reminders
     if 10 <= temp_high <= 14:
@@ -105,20 +360,19 @@ def get_clothing_recommendation(temp_high, temp_low, weather_condition, precipit
         recommendations.append("Bring extra layers for cold mornings/evenings")
 
     # Rain-specific recommendations
-    if 'rain' in weather_condition.lower() or 'drizzle' in weather_condition.lower():
+    if 'rain' in conditions or 'drizzle' in conditions:
         recommendations.append("Bring an umbrella")
         recommendations.append("Wear a waterproof jacket")
         recommendations.append("Wear waterproof boots")
-    elif precipitation_prob > 50:
-        recommendations.append("Bring an umbrella or rain jacket")
-    elif precipitation_prob > 30:
-        recommendations.append("Consider bringing an umbrella")
+    else:
+        # bisect_left so a chance exactly on a threshold stays in the lower bucket
+        recommendations.extend(_PRECIP_RECS[bisect.bisect_left(_PRECIP_THRESHOLDS, precipitation_prob)])
 
-    if 'snow' in weather_condition.lower():
+    if 'snow' in conditions:
         recommendations.append("Winter boots and warm accessories (hat, gloves)")
 
     # Sunny day recommendations
-    if 'clear' in weather_condition.lower() or 'sun' in weather_condition.lower():
+    if 'clear' in conditions or 'sun' in conditions:
         recommendations.append("Wear sunscreen")
 
     # Wind-specific recommendations (only for cooler temperatures, but not if toque already recommended)
@@ -130,44 +384,45 @@ def get_clothing_recommendation(temp_high, temp_low, weather_condition, precipit
     if temp_high - temp_low > 20:
         recommendations.append("Temperature varies significantly - dress in layers")
 
-    return recommendations
+    return tuple(recommendations)
 
 
 def get_weather_icon_path(weather_condition):
     """
     Determine which weather icon to use based on conditions
+    weather_condition must already be lowercase
     Priority: thunderstorm > snow > rain > clouds > clear
     """
-    weather_lower = weather_condition.lower()
-
-    # Get the script directory to build absolute paths
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-
-    # Check for severe weather first (highest priority)
-    if 'thunderstorm' in weather_lower or 'thunder' in weather_lower:
-        return os.path.join(script_dir, 'thunder.png')
-    elif 'snow' in weather_lower or 'sleet' in weather_lower or 'flurr' in weather_lower:
-        return os.path.join(script_dir, 'snow.png')
-    elif 'rain' in weather_lower or 'drizzle' in weather_lower:
-        return os.path.join(script_dir, 'rainy cloud.png')
-    elif 'cloud' in weather_lower:
-        # Check if it's partly cloudy
-        if 'few' in weather_lower or 'scattered' in weather_lower or 'partly' in weather_lower:
-            return os.path.join(script_dir, 'partly sunny.png')
-        else:
-            return os.path.join(script_dir, 'cloudy.png')
-    elif 'clear' in weather_lower or 'sun' in weather_lower:
-        return os.path.join(script_dir, 'sun.png')
-    else:
-        # Default to partly sunny for unknown conditions
-        return os.path.join(script_dir, 'partly sunny.png')
+    # First matching rule wins; unknown conditions default to partly sunny
+    icon = next((icon for keywords, icon in _ICON_RULES if any(k in weather_condition for k in keywords)), 'partly sunny')
+
+    # Few/scattered clouds still get some sun
+    if icon == 'cloudy' and any(k in weather_condition for k in _PARTLY_CLOUDY_KW):
+        icon = 'partly sunny'
+
+    return _ICON_PATHS[icon]
+
+
+def _to_celsius(temp, units):
+    """
+    Convert a temperature reported in the given units to Celsius
+    """
+    return temp if units == 'metric' else (temp - 32) * 5 / 9
 
 
-def create_email_body(weather_data):
+def create_email_body(weather_data, now=None, units='metric', html=True):
     """
     Create formatted email body with weather info and clothing recommendations
-    Returns tuple of (text_body, html_body, icon_path)
+    weather_data must have been fetched with the same units
+    Returns tuple of (text_body, html_body, icon_path, windy_icon_path);
+    with html=False only the text body is built and the rest are None
     """
+    if now is None:
+        now = datetime.now()
+    generated_on = now.strftime(_BODY_FMT)
+    unit = UNIT_SYSTEMS[units]
+    deg = unit['temp']
+
     today = weather_data['daily'][0]
     current = weather_data['current']
 
@@ -175,233 +430,309 @@ def create_email_body(weather_data):
     temp_low = round(today['temp']['min'])
     current_temp = round(current['temp'])
     feels_like = round(current['feels_like'])
-    weather_main = today['weather'][0]['main']
-    weather_desc = today['weather'][0]['description'].capitalize()
+    # Lowercase the conditions once; the recommendation and icon helpers expect it
+    weather_main = today['weather'][0]['main'].lower()
+    description = today['weather'][0]['description'].lower()
+    weather_desc = description.capitalize()
     precipitation_prob = round(today.get('pop', 0) * 100)
     humidity = today.get('humidity', current.get('humidity', 0))
-    wind_speed_ms = today.get('wind_speed', current.get('wind_speed', 0))
-    wind_speed_kmh = round(wind_speed_ms * 3.6)  # Convert m/s to km/h
-
-    # Get clothing recommendations
-    recommendations = get_clothing_recommendation(temp_high, temp_low, weather_main, precipitation_prob, wind_speed_kmh)
+    wind_speed = today.get('wind_speed', current.get('wind_speed', 0))
+    wind_speed_display = round(wind_speed * unit['wind_display'])
+    wind_speed_kmh = round(wind_speed * unit['wind_kmh'])
 
-    # Get weather icon
-    icon_path = get_weather_icon_path(weather_desc)
-
-    # Check if we need windy icon
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    windy_icon_path = os.path.join(script_dir, 'windy.png') if wind_speed_kmh > 20 else None
+    # Get clothing recommendations (the rules are written in Celsius)
+    high_c = round(_to_celsius(today['temp']['max'], units))
+    low_c = round(_to_celsius(today['temp']['min'], units))
+    recommendations = get_clothing_recommendation(high_c, low_c, weather_main, precipitation_prob, wind_speed_kmh)
 
     # Build text email body (fallback)
-    text_body = f"""Good morning!
-
-Here's your weather forecast and clothing recommendations for today:
-
-WEATHER SUMMARY
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-Current: {current_temp}°C (feels like {feels_like}°C)
-High: {temp_high}°C
-Low: {temp_low}°C
-Conditions: {weather_desc}
-Precipitation chance: {precipitation_prob}%
-Humidity: {humidity}%
-Wind speed: {wind_speed_kmh} km/h
+    rec_block = "\n".join(f"{i}. {rec}" for i, rec in enumerate(recommendations, 1))
+    text_body = "".join([
+        _TEXT_HEADER_FMT.format(
+            divider=DIVIDER, deg=deg, current_temp=current_temp, feels_like=feels_like,
+            temp_high=temp_high, temp_low=temp_low, weather_desc=weather_desc,
+            precipitation_prob=precipitation_prob, humidity=humidity,
+            wind_speed=wind_speed_display, wind_unit=unit['wind']
+        ),
+        rec_block,
+        _TEXT_FOOTER_FMT.format(divider=DIVIDER, generated_on=generated_on)
+    ])
+
+    if not html:
+        return text_body, None, None, None
 
-WHAT TO WEAR TODAY
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-"""
-
-    for i, rec in enumerate(recommendations, 1):
-        text_body += f"{i}. {rec}\n"
+    # Get weather icon
+    icon_path = get_weather_icon_path(description)
 
-    text_body += f"""
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+    # Check if we need windy icon
+    windy_icon_path = _ICON_PATHS['windy'] if wind_speed_kmh > 20 else None
 
-Have a great day!
+    # Build HTML email body (with image)
+    html_body = _HTML_TMPL.substitute(
+        windy_img=_WINDY_IMG if wind_speed_kmh > 20 else "",
+        deg=deg, current_temp=current_temp, feels_like=feels_like,
+        temp_high=temp_high, temp_low=temp_low, weather_desc=weather_desc,
+        precipitation_prob=precipitation_prob, humidity=humidity,
+        wind_speed=wind_speed_display, wind_unit=unit['wind'],
+        recommendations_html="".join(map(_LI_FMT, recommendations)),
+        generated_on=generated_on
+    )
 
----
-Generated on {datetime.now().strftime('%Y-%m-%d at %I:%M %p')}
-"""
+    return text_body, html_body, icon_path, windy_icon_path
 
-    # Build HTML email body (with image)
-    recommendations_html = "".join([f"<li>{rec}</li>" for rec in recommendations])
 
-    html_body = f"""
-    <html>
-    <head>
-        <style>
-            body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-            .container {{ max-width: 600px; margin: 0 auto; padding: 20px; text-align: center; }}
-            .weather-icon {{ text-align: center; margin: 20px auto; display: block; }}
-            .weather-icon img {{ max-width: 200px; height: auto; display: inline-block; vertical-align: middle; }}
-            .weather-summary {{ background-color: #f4f4f4; padding: 15px; border-radius: 5px; margin: 20px 0; text-align: left; }}
-            .weather-summary h2 {{ margin-top: 0; color: #2c3e50; }}
-            .weather-detail {{ margin: 10px 0; }}
-            .recommendations {{ background-color: #e8f4f8; padding: 15px; border-radius: 5px; text-align: left; }}
-            .recommendations h2 {{ margin-top: 0; color: #2c3e50; }}
-            ul {{ padding-left: 20px; }}
-            li {{ margin: 8px 0; }}
-            .footer {{ margin-top: 30px; padding-top: 20px; border-top: 1px solid #ddd; font-size: 0.9em; color: #666; text-align: center; }}
-            h1, p {{ text-align: center; }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <h1>Good morning!</h1>
-            <p>Here's your weather forecast and clothing recommendations for today:</p>
+# Verifying TLS context shared by every SMTP connection
+_SSL_CONTEXT = ssl.create_default_context()
 
-            <div class="weather-icon">
-                <img src="cid:weather_icon" alt="Weather Icon">
-                {"<img src='cid:windy_icon' alt='Windy' style='margin-left: 10px;'>" if wind_speed_kmh > 20 else ""}
-            </div>
 
-            <div class="weather-summary">
-                <h2>Weather Summary</h2>
-                <div class="weather-detail"><strong>Current:</strong> {current_temp}°C (feels like {feels_like}°C)</div>
-                <div class="weather-detail"><strong>High:</strong> {temp_high}°C</div>
-                <div class="weather-detail"><strong>Low:</strong> {temp_low}°C</div>
-                <div class="weather-detail"><strong>Conditions:</strong> {weather_desc}</div>
-                <div class="weather-detail"><strong>Precipitation chance:</strong> {precipitation_prob}%</div>
-                <div class="weather-detail"><strong>Humidity:</strong> {humidity}%</div>
-                <div class="weather-detail"><strong>Wind speed:</strong> {wind_speed_kmh} km/h</div>
-            </div>
+class SmtpSender:
+    """
+    Long-lived SMTP connection that logs in once and sends any number of messages
+    Use as a context manager so the connection is closed when the batch is done
+    Uses implicit TLS (SMTP_SSL, usually port 465) when use_ssl is set, otherwise STARTTLS
+    """
 
-            <div class="recommendations">
-                <h2>What to Wear Today</h2>
-                <ul>
-                    {recommendations_html}
-                </ul>
-            </div>
+    def __init__(self, smtp_server, smtp_port, sender_email, sender_password, use_ssl=False):
+        self.smtp_server = smtp_server
+        self.smtp_port = smtp_port
+        self.sender_email = sender_email
+        self.sender_password = sender_password
+        self.use_ssl = use_ssl
+        self.server = None
+
+    def connect(self):
+        log.info("Connecting to %s:%s...", self.smtp_server, self.smtp_port)
+        if self.use_ssl:
+            self.server = smtplib.SMTP_SSL(self.smtp_server, self.smtp_port, timeout=30, context=_SSL_CONTEXT)
+        else:
+            # starttls() and login() send EHLO themselves when it is needed
+            self.server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=30)
+            log.info("Starting TLS...")
+            self.server.starttls(context=_SSL_CONTEXT)
+        log.info("Logging in...")
+        self.server.login(self.sender_email, self.sender_password)
+
+    def send(self, message):
+        if self.server is None:
+            self.connect()
+        log.info("Sending email...")
+        try:
+            self.server.send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            # The server dropped an idle connection; release it, log in again and retry once
+            self.close()
+            self.connect()
+            self.server.send_message(message)
+
+    def __enter__(self):
+        # No connection is opened here; daily_weather_email starts it in the background
+        # and send() connects on demand if nothing has yet
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        if self.server:
+            try:
+                self.server.quit()
+            except Exception:
+                pass
+            self.server = None
 
-            <p><strong>Have a great day!</strong></p>
 
-            <div class="footer">
-                Generated on {datetime.now().strftime('%Y-%m-%d at %I:%M %p')}
-            </div>
-        </div>
-    </body>
-    </html>
+@functools.lru_cache(maxsize=16)
+def _icon_part(icon_path, content_id):
     """
-
-    return text_body, html_body, icon_path, windy_icon_path
+    Read an icon and encode it as an inline image part, once per process
+    The part is shared between messages, so it must be attached as-is
+    """
+    part = MIMEPart()
+    part.set_content(Path(icon_path).read_bytes(), maintype='image', subtype='png', cid=content_id, disposition='inline', filename=os.path.basename(icon_path))
+    return part
 
 
-def send_email(sender_email, sender_password, recipient_email, subject, text_body, html_body, icon_path, windy_icon_path, smtp_server, smtp_port):
+def build_email_message(sender_email, subject, text_body, html_body, icon_path, windy_icon_path):
     """
-    Send email using SMTP with both text and HTML parts and embedded images
+    Build the email with text and HTML alternatives and the icons embedded alongside the HTML
+    If html_body is None a plain-text email is built and the icons are skipped
+    The To header is filled in by send_email, so one message can be sent to every recipient
     """
-    message = MIMEMultipart('related')
+    message = EmailMessage()
     message['From'] = sender_email
-    message['To'] = recipient_email
     message['Subject'] = subject
 
-    # Create alternative part for text and HTML
-    msg_alternative = MIMEMultipart('alternative')
-    message.attach(msg_alternative)
+    # Text part with an HTML alternative
+    message.set_content(text_body)
+    if html_body is None:
+        return message
 
-    # Attach text and HTML parts
-    msg_alternative.attach(MIMEText(text_body, 'plain'))
-    msg_alternative.attach(MIMEText(html_body, 'html'))
+    message.add_alternative(html_body, subtype='html')
+    html_part = message.get_payload()[1]
+    html_part.make_related()
 
     # Attach the weather icon image
     try:
-        with open(icon_path, 'rb') as img_file:
-            img_data = img_file.read()
-            img = MIMEImage(img_data)
-            img.add_header('Content-ID', '<weather_icon>')
-            img.add_header('Content-Disposition', 'inline', filename=os.path.basename(icon_path))
-            message.attach(img)
+        html_part.attach(_icon_part(icon_path, '<weather_icon>'))
     except FileNotFoundError:
-        print(f"Warning: Weather icon not found at {icon_path}. Email will be sent without icon.")
+        log.warning("Weather icon not found at %s. Email will be sent without icon.", icon_path)
     except Exception as e:
-        print(f"Warning: Could not attach weather icon: {e}. Email will be sent without icon.")
+        log.warning("Could not attach weather icon: %s. Email will be sent without icon.", e)
 
     # Attach the windy icon if wind speed is high
     if windy_icon_path:
         try:
-            with open(windy_icon_path, 'rb') as img_file:
-                img_data = img_file.read()
-                img = MIMEImage(img_data)
-                img.add_header('Content-ID', '<windy_icon>')
-                img.add_header('Content-Disposition', 'inline', filename=os.path.basename(windy_icon_path))
-                message.attach(img)
+            html_part.attach(_icon_part(windy_icon_path, '<windy_icon>'))
         except FileNotFoundError:
-            print(f"Warning: Windy icon not found at {windy_icon_path}. Email will be sent without windy icon.")
+            log.warning("Windy icon not found at %s. Email will be sent without windy icon.", windy_icon_path)
         except Exception as e:
-            print(f"Warning: Could not attach windy icon: {e}. Email will be sent without windy icon.")
+            log.warning("Could not attach windy icon: %s. Email will be sent without windy icon.", e)
+
+    return message
+
+
+def _exit_on_smtp_error(e):
+    """
+    Log an error from connecting, logging in or sending, then exit
+    """
+    if isinstance(e, smtplib.SMTPAuthenticationError):
+        log.error("Authentication failed: %s", e)
+        log.error("Check your email and password/app password are correct")
+    elif isinstance(e, smtplib.SMTPException):
+        log.error("SMTP error: %s", e)
+    else:
+        log.error("Error sending email: %s", e)
+        log.error("Error type: %s", type(e).__name__)
+    sys.exit(1)
+
+
+def send_email(sender, message, recipient_email):
+    """
+    Send a message built by build_email_message to one recipient through an SmtpSender
+    """
+    # Only the To header differs between recipients
+    del message['To']
+    message['To'] = recipient_email
 
-    server = None
     try:
-        # Connect to SMTP server
-        print(f"Connecting to {smtp_server}:{smtp_port}...")
-        server = smtplib.SMTP(smtp_server, smtp_port, timeout=30)
-        server.ehlo()
-        print("Starting TLS...")
-        server.starttls()
-        server.ehlo()
-        print("Logging in...")
-        server.login(sender_email, sender_password)
-
-        # Send email
-        print("Sending email...")
-        server.send_message(message)
-        print(f"Email sent successfully to {recipient_email}")
-
-    except smtplib.SMTPAuthenticationError as e:
-        print(f"Authentication failed: {e}")
-        print("Check your email and password/app password are correct")
-        sys.exit(1)
-    except smtplib.SMTPException as e:
-        print(f"SMTP error: {e}")
-        sys.exit(1)
+        # Send email (connects and logs in on first use)
+        sender.send(message)
+        log.info("Email sent successfully to %s", recipient_email)
     except Exception as e:
-        print(f"Error sending email: {e}")
-        print(f"Error type: {type(e).__name__}")
-        sys.exit(1)
-    finally:
-        if server:
-            try:
-                server.quit()
-            except:
-                pass
+        _exit_on_smtp_error(e)
 
 
-def main():
-    # Get configuration from environment variables (strip whitespace)
-    api_key = os.getenv('OPENWEATHER_API_KEY', '').strip()
-    latitude = os.getenv('LATITUDE', '40.7128').strip()
-    longitude = os.getenv('LONGITUDE', '-74.0060').strip()
-
-    sender_email = os.getenv('SENDER_EMAIL', '').strip()
-    sender_password = os.getenv('SENDER_PASSWORD', '').strip()
-    recipient_email = os.getenv('RECIPIENT_EMAIL', sender_email).strip() if os.getenv('RECIPIENT_EMAIL') else sender_email
-
-    # Use 'or' to handle empty strings for SMTP settings
-    smtp_server = (os.getenv('SMTP_SERVER') or 'smtp.gmail.com').strip()
-    smtp_port = int((os.getenv('SMTP_PORT') or '587').strip())
-
-    # Validate required environment variables
-    if not api_key:
-        print("Error: OPENWEATHER_API_KEY environment variable is required")
-        sys.exit(1)
-    if not sender_email or not sender_password:
-        print("Error: SENDER_EMAIL and SENDER_PASSWORD environment variables are required")
-        sys.exit(1)
+@dataclass(frozen=True, slots=True)
+class Config:
+    """
+    Settings read from the environment once at startup
+    """
+    api_key: str
+    latitude: float
+    longitude: float
+    units: str
+    sender_email: str
+    sender_password: str
+    recipient_emails: tuple
+    smtp_server: str
+    smtp_port: int
+    html_email: bool
+
+    @classmethod
+    def from_env(cls):
+        """
+        Read and validate configuration from environment variables (whitespace stripped)
+        Exits with an error message if a required setting is missing or invalid
+        """
+        api_key = os.getenv('OPENWEATHER_API_KEY', '').strip()
+        latitude = (os.getenv('LATITUDE') or '40.7128').strip()
+        longitude = (os.getenv('LONGITUDE') or '-74.0060').strip()
+        units = (os.getenv('UNITS') or 'metric').strip().lower()
+
+        sender_email = os.getenv('SENDER_EMAIL', '').strip()
+        sender_password = os.getenv('SENDER_PASSWORD', '').strip()
+        # RECIPIENT_EMAIL may hold several comma-separated addresses
+        recipient_emails = tuple(email.strip() for email in os.getenv('RECIPIENT_EMAIL', '').split(',') if email.strip()) or (sender_email,)
+
+        # Use 'or' to handle empty strings for SMTP settings
+        smtp_server = (os.getenv('SMTP_SERVER') or 'smtp.gmail.com').strip()
+        smtp_port = int((os.getenv('SMTP_PORT') or '587').strip())
+
+        # HTML_EMAIL=0 sends a plain-text email without the HTML part or icons
+        html_email = (os.getenv('HTML_EMAIL') or '1').strip().lower() not in ('0', 'false', 'no')
+
+        # Validate required environment variables
+        if not api_key:
+            log.error("OPENWEATHER_API_KEY environment variable is required")
+            sys.exit(1)
+        if not sender_email or not sender_password:
+            log.error("SENDER_EMAIL and SENDER_PASSWORD environment variables are required")
+            sys.exit(1)
+        if units not in UNIT_SYSTEMS:
+            log.error("UNITS must be one of %s", ", ".join(UNIT_SYSTEMS))
+            sys.exit(1)
+
+        # Parse coordinates once so bad values fail here rather than at the API
+        try:
+            latitude = float(latitude)
+            longitude = float(longitude)
+        except ValueError:
+            log.error("LATITUDE and LONGITUDE must be decimal numbers, got %r, %r", latitude, longitude)
+            sys.exit(1)
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            log.error("LATITUDE must be within [-90, 90] and LONGITUDE within [-180, 180], got %s, %s", latitude, longitude)
+            sys.exit(1)
 
-    # Debug: Show API key length and first/last few characters (for troubleshooting)
-    print(f"API Key length: {len(api_key)}")
-    print(f"API Key format check: {api_key[:4]}...{api_key[-4:]}")
-    print(f"Fetching weather for coordinates: {latitude}, {longitude}")
+        return cls(api_key, latitude, longitude, units, sender_email, sender_password, recipient_emails, smtp_server, smtp_port, html_email)
+
+
+def daily_weather_email(config, sender):
+    """
+    Fetch today's forecast and email it to each recipient through sender
+    Safe to call repeatedly from a long-running scheduler: the HTTP session,
+    response cache, memoized recommendations and the SmtpSender connection
+    all stay warm between calls
+    """
+    # Log in to SMTP while the forecast is being fetched
+    connecting = _EXECUTOR.submit(sender.connect) if sender.server is None else None
+
+    log.info("Fetching weather for coordinates: %s, %s", config.latitude, config.longitude)
 
     # Get weather data
-    weather_data = get_weather_forecast(api_key, latitude, longitude)
+    weather_data = get_weather_forecast(config.api_key, config.latitude, config.longitude, config.units)
 
     # Create email content
-    text_body, html_body, icon_path, windy_icon_path = create_email_body(weather_data)
-    subject = f"Your Daily Weather & Outfit Guide - {datetime.now().strftime('%B %d, %Y')}"
+    now = datetime.now()
+    text_body, html_body, icon_path, windy_icon_path = create_email_body(weather_data, now, config.units, config.html_email)
+    subject = f"Your Daily Weather & Outfit Guide - {now.strftime(_SUBJECT_FMT)}"
+
+    message = build_email_message(config.sender_email, subject, text_body, html_body, icon_path, windy_icon_path)
+
+    # Report a failed early login instead of retrying it, so bad credentials cost one AUTH attempt
+    if connecting is not None and connecting.exception() is not None:
+        _exit_on_smtp_error(connecting.exception())
+
+    for recipient_email in config.recipient_emails:
+        send_email(sender, message, recipient_email)
+
+
+def main():
+    # Log to stderr; set LOGLEVEL=DEBUG for troubleshooting output or WARNING for quiet runs
+    log_level = (os.getenv('LOGLEVEL') or 'INFO').strip().upper()
+    known_level = log_level in logging.getLevelNamesMapping()
+    logging.basicConfig(level=log_level if known_level else logging.INFO, format='%(levelname)s: %(message)s')
+    if not known_level:
+        log.warning("Unknown LOGLEVEL %r, using INFO", log_level)
+
+    config = Config.from_env()
+
+    # Debug: Show API key length and first/last few characters (for troubleshooting)
+    log.debug("API Key length: %d", len(config.api_key))
+    log.debug("API Key format check: %s...%s", config.api_key[:4], config.api_key[-4:])
 
-    # Send email
-    send_email(sender_email, sender_password, recipient_email, subject, text_body, html_body, icon_path, windy_icon_path, smtp_server, smtp_port)
+    # Send one email per recipient over a single SMTP connection
+    with SmtpSender(config.smtp_server, config.smtp_port, config.sender_email, config.sender_password, use_ssl=config.smtp_port == 465) as sender:
+        daily_weather_email(config, sender)
 
 
 if __name__ == "__main__":